@@ -1,6 +1,8 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, request, jsonify, render_template, session, abort
+import hmac
 import json
 import os
+from functools import wraps
 import requests  # 改为使用requests库
 from datetime import datetime
 from persona_builder import CelebrityPersonaBuilder
@@ -12,13 +14,18 @@ app.secret_key = os.urandom(24)
 
 # 初始化组件
 persona_builder = CelebrityPersonaBuilder()
-memory_system = MemorySystem()
+# MEMORY_SHARDS>1 时按 user_id 哈希把对话分散到多个 SQLite 文件，减少多 worker 写锁竞争
+memory_system = MemorySystem(num_shards=int(os.environ.get('MEMORY_SHARDS', 1)))
 scraper = CelebrityDataScraper()
 
 # DeepSeek API配置
 DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY', 'sk-5758a530c77d455a82784755ecfb6bc4')
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 
+# 管理接口令牌：未设置时 /admin/* 接口全部关闭
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+ADMIN_MAX_LIMIT = 200
+
 
 class CelebrityAgent:
     def __init__(self, celebrity_name):
@@ -175,6 +182,42 @@ def get_memory(user_id):
     return jsonify(memory)
 
 
+def admin_required(view):
+    """管理接口鉴权：需要设置 ADMIN_TOKEN，并在请求头 X-Admin-Token 中带上相同的值"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            abort(404)
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/admin/users')
+@admin_required
+def admin_users():
+    """跨所有分片列出用户（需要管理令牌）"""
+    return jsonify(memory_system.list_users())
+
+
+@app.route('/admin/conversations')
+@admin_required
+def admin_conversations():
+    """跨所有分片获取最近对话（需要管理令牌）"""
+    limit = request.args.get('limit', 20, type=int)
+    limit = min(max(limit, 1), ADMIN_MAX_LIMIT)
+    return jsonify(memory_system.get_recent_conversations(limit=limit))
+
+
+@app.route('/admin/shards')
+@admin_required
+def admin_shards():
+    """查看各分片的数据量（需要管理令牌）"""
+    return jsonify(memory_system.get_shard_stats())
+
+
 @app.route('/persona')
 def get_persona():
     """获取当前明星的人设信息（用于调试）"""
@@ -0,0 +1,91 @@
+"""分片写入吞吐量基准测试
+
+模拟多个 gunicorn worker 进程同时调用 save_conversation，比较不同分片数下的写入吞吐量。
+吞吐量同时受写锁竞争和每次提交的 fsync 开销影响；用 --synchronous OFF 去掉 fsync，
+可以单独观察锁竞争。分片的并行收益依赖 CPU 核数，结果要结合输出里的核数来看。
+
+用法：
+    python bench_sharding.py --workers 8 --writes 500 --shards 1 2 4 8
+    python bench_sharding.py --synchronous OFF
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from memory_system import MemorySystem
+
+
+class BenchMemorySystem(MemorySystem):
+    def __init__(self, *args, synchronous="FULL", **kwargs):
+        self.synchronous = synchronous
+        super().__init__(*args, **kwargs)
+
+    def _connect(self, user_id):
+        conn = super()._connect(user_id)
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
+
+
+def _worker(db_path, num_shards, synchronous, worker_id, writes, start_event):
+    memory_system = BenchMemorySystem(db_path, num_shards=num_shards, synchronous=synchronous)
+    start_event.wait()
+    for i in range(writes):
+        user_id = f"user_{worker_id}_{i % 50}"
+        memory_system.save_conversation(user_id, f"消息 {i}", f"回复 {i}")
+
+
+def run(num_shards, workers, writes, synchronous="FULL"):
+    """返回指定分片数下的每秒写入次数"""
+    tmp_dir = tempfile.mkdtemp(prefix="bench_sharding_")
+    try:
+        db_path = os.path.join(tmp_dir, "chat_memory.db")
+        MemorySystem(db_path, num_shards=num_shards)
+
+        start_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(db_path, num_shards, synchronous, worker_id, writes, start_event),
+            )
+            for worker_id in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        start = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [p.exitcode for p in processes if p.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} 个 worker 异常退出")
+        return workers * writes / elapsed
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片写入吞吐量基准测试")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="并发写入进程数")
+    parser.add_argument("--writes", type=int, default=500, help="每个进程写入次数")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="要测试的分片数")
+    parser.add_argument("--synchronous", choices=["FULL", "NORMAL", "OFF"], default="FULL",
+                        help="SQLite synchronous 设置，OFF 可排除 fsync 开销")
+    args = parser.parse_args()
+
+    print(f"cpu_cores={os.cpu_count()} workers={args.workers} writes/worker={args.writes} "
+          f"synchronous={args.synchronous}")
+    baseline = None
+    for num_shards in args.shards:
+        throughput = run(num_shards, args.workers, args.writes, args.synchronous)
+        baseline = baseline or throughput
+        print(f"shards={num_shards:<3} {throughput:10.1f} writes/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,116 @@
 import sqlite3
 import json
+import logging
+import zlib
 from datetime import datetime
 import os
 
+logger = logging.getLogger(__name__)
+
+
+def shard_paths(db_path, num_shards):
+    """根据主数据库路径生成分片文件路径列表（只有1个分片时就是原文件）"""
+    if num_shards <= 1:
+        return [db_path]
+    base, ext = os.path.splitext(db_path)
+    return [f"{base}.shard{i}{ext}" for i in range(num_shards)]
+
+
+def shard_index(user_id, num_shards):
+    """按 user_id 的稳定哈希选择分片（不能用内置 hash，它在每个进程里是随机化的）"""
+    if num_shards <= 1:
+        return 0
+    return zlib.crc32(str(user_id).encode("utf-8")) % num_shards
+
+
 class MemorySystem:
-    def __init__(self, db_path="chat_memory.db"):
+    def __init__(self, db_path="chat_memory.db", num_shards=1, timeout=30):
         self.db_path = db_path
+        self.num_shards = max(1, int(num_shards))
+        self.timeout = timeout
+        self.shard_paths = shard_paths(db_path, self.num_shards)
+        self._warn_unmigrated_data()
         self.init_database()
-    
+
+    def _warn_unmigrated_data(self):
+        """分片数改变但没有先运行 reshard.py 时，部分用户的历史会读不到，这里给出警告
+
+        分片文件里记录的分片数和当前配置不一致时警告；
+        另外，分片数之外残留的旧文件（单文件或编号更大的分片）里还有对话时也会警告。
+        """
+        for path in self.shard_paths:
+            recorded = self._read_meta(path, "num_shards")
+            if recorded is not None and int(recorded) != self.num_shards:
+                logger.warning(
+                    "%s 是按 %s 个分片创建的，但当前配置为 %d 个分片，部分用户的历史不会被读取；"
+                    "请先停掉应用并用 reshard.py 迁移数据",
+                    path, recorded, self.num_shards,
+                )
+                break
+
+        leftover_paths = [self.db_path] if self.num_shards > 1 else []
+        base, ext = os.path.splitext(self.db_path)
+        index = self.num_shards if self.num_shards > 1 else 0
+        while os.path.exists(f"{base}.shard{index}{ext}"):
+            leftover_paths.append(f"{base}.shard{index}{ext}")
+            index += 1
+
+        for path in leftover_paths:
+            count = self._count_conversations(path)
+            if count:
+                logger.warning(
+                    "%s 中还有 %d 条对话不在当前 %d 个分片里，这些历史不会被读取；"
+                    "请先停掉应用并用 reshard.py 迁移数据",
+                    path, count, self.num_shards,
+                )
+
+    def _read_meta(self, path, key):
+        """读取分片文件里记录的元数据，文件或表不存在时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            conn = sqlite3.connect(path, timeout=self.timeout)
+            try:
+                row = conn.execute("SELECT value FROM shard_meta WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def _count_conversations(self, path):
+        """统计某个数据库文件里的对话数，文件或表不存在时返回 0"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            conn = sqlite3.connect(path, timeout=self.timeout)
+            try:
+                return conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return 0
+
+    def _shard_path(self, user_id):
+        """获取用户所在分片的数据库路径"""
+        return self.shard_paths[shard_index(user_id, self.num_shards)]
+
+    def _connect(self, user_id):
+        """为用户所在的分片新开一个连接（每次调用都新建，用完由调用方关闭）
+
+        没有连接池；并发控制完全依赖 SQLite 的文件锁。分片是不同的文件，
+        所以不同分片上的写入不会争抢同一把锁。
+        """
+        return sqlite3.connect(self._shard_path(user_id), timeout=self.timeout)
+
     def init_database(self):
-        """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
+        """初始化数据库（所有分片）"""
+        for path in self.shard_paths:
+            self._init_shard(path)
+
+    def _init_shard(self, path):
+        """初始化单个分片的表结构"""
+        conn = sqlite3.connect(path, timeout=self.timeout)
         cursor = conn.cursor()
         
         # 创建对话记录表
@@ -36,12 +136,23 @@ class MemorySystem:
             )
         ''')
         
+        # 记录创建时的分片数，启动时用来发现没有迁移就改了 MEMORY_SHARDS 的情况
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shard_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO shard_meta (key, value) VALUES ('num_shards', ?)
+        ''', (str(self.num_shards),))
+        
         conn.commit()
         conn.close()
     
     def save_conversation(self, user_id, user_message, bot_response, context_summary=None):
         """保存对话记录"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect(user_id)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -62,7 +173,7 @@ class MemorySystem:
     
     def get_conversation_history(self, user_id, limit=5):
         """获取用户对话历史"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect(user_id)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -81,7 +192,7 @@ class MemorySystem:
     
     def get_user_profile(self, user_id):
         """获取用户画像"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect(user_id)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -103,7 +214,7 @@ class MemorySystem:
     
     def update_user_interests(self, user_id, interests):
         """更新用户兴趣"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect(user_id)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -135,4 +246,56 @@ class MemorySystem:
         unique_topics = list(set(topics))
         summary = f"最近聊过：{', '.join(unique_topics)}" if unique_topics else "对话内容多样"
         
-        return summary
\ No newline at end of file
+        return summary
+
+    def _query_all_shards(self, sql, params=()):
+        """在所有分片上执行同一查询并合并结果（管理后台的跨用户查询）"""
+        rows = []
+        for path in self.shard_paths:
+            conn = sqlite3.connect(path, timeout=self.timeout)
+            try:
+                rows.extend(conn.execute(sql, params).fetchall())
+            finally:
+                conn.close()
+        return rows
+
+    def list_users(self):
+        """列出所有分片中的用户，按最近互动时间倒序"""
+        rows = self._query_all_shards('''
+            SELECT user_id, total_interactions, last_interaction
+            FROM user_profiles
+        ''')
+        rows.sort(key=lambda row: row[2] or "", reverse=True)
+        return [
+            {"user_id": user_id, "total_interactions": total, "last_interaction": last}
+            for user_id, total, last in rows
+        ]
+
+    def get_recent_conversations(self, limit=20):
+        """获取所有用户最近的对话记录（每个分片取前 limit 条后合并）"""
+        if limit <= 0:
+            raise ValueError("limit 必须是正整数")
+        rows = self._query_all_shards('''
+            SELECT user_id, user_message, bot_response, timestamp
+            FROM conversations
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (limit,))
+        rows.sort(key=lambda row: row[3] or "", reverse=True)
+        return [
+            {"user_id": user_id, "user_message": msg, "bot_response": resp, "timestamp": ts}
+            for user_id, msg, resp, ts in rows[:limit]
+        ]
+
+    def get_shard_stats(self):
+        """统计每个分片的用户数和对话数"""
+        stats = []
+        for path in self.shard_paths:
+            conn = sqlite3.connect(path, timeout=self.timeout)
+            try:
+                users = conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+                conversations = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            finally:
+                conn.close()
+            stats.append({"path": path, "users": users, "conversations": conversations})
+        return stats
\ No newline at end of file
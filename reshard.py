@@ -0,0 +1,177 @@
+"""离线重新分片工具
+
+把现有的对话数据库（单个 chat_memory.db 或已有的分片）按 user_id 哈希重新分配到 N 个分片文件。
+运行前请先停掉应用，避免迁移过程中还有写入。
+如果目标分片文件已经存在且不属于源文件，工具会拒绝执行，防止用旧数据覆盖线上分片；确需覆盖时加 --force。
+
+用法：
+    python reshard.py --shards 4                    # chat_memory.db -> chat_memory.shard0..3.db
+    python reshard.py --from-shards 4 --shards 8    # 4 个分片 -> 8 个分片
+    python reshard.py --from-shards 4 --shards 1    # 合并回单个 chat_memory.db
+"""
+import argparse
+import os
+import sqlite3
+
+from memory_system import MemorySystem, shard_index, shard_paths
+
+
+def reshard(db_path, from_shards, to_shards, remove_source=False, force=False):
+    """把 from_shards 个分片的数据重新分配到 to_shards 个分片，返回迁移的对话数和用户数
+
+    如果某个目标文件已存在且不是源文件（例如已经分过片的线上数据），默认拒绝执行，
+    需要 force=True 才会覆盖。
+    """
+    source_paths = shard_paths(db_path, from_shards)
+    missing = [path for path in source_paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"找不到源数据库: {', '.join(missing)}")
+
+    target_paths = shard_paths(db_path, to_shards)
+    if source_paths == target_paths:
+        return 0, 0
+
+    conflicts = [
+        path for path in target_paths
+        if path not in source_paths and os.path.exists(path)
+    ]
+    if conflicts and not force:
+        raise FileExistsError(
+            f"目标分片已存在且不在源文件中，继续会覆盖其中的数据: {', '.join(conflicts)}"
+            "（请确认 --from-shards 是否正确，或使用 --force 强制覆盖）"
+        )
+
+    # 先写到临时文件，全部成功后再替换，避免目标和源文件同名时互相覆盖
+    base, ext = os.path.splitext(db_path)
+    tmp_db_path = f"{base}.resharding{ext}"
+    tmp_paths = shard_paths(tmp_db_path, to_shards)
+    _remove_files(tmp_paths)
+    try:
+        MemorySystem(tmp_db_path, num_shards=to_shards)
+        conversation_count, user_count = _copy_shards(source_paths, tmp_paths, to_shards)
+        _verify_shards(tmp_paths, conversation_count, user_count)
+    except BaseException:
+        # 复制或校验失败时清掉临时文件，线上分片保持原样
+        _remove_files(tmp_paths)
+        raise
+
+    # 到这里所有临时分片都已提交并校验过，只剩逐个 rename 这一步可能中途失败
+    replaced = []
+    for i, (tmp_path, target_path) in enumerate(zip(tmp_paths, target_paths)):
+        try:
+            os.replace(tmp_path, target_path)
+        except OSError as e:
+            pending = [f"{tmp} -> {target}" for tmp, target in zip(tmp_paths[i:], target_paths[i:])]
+            raise RuntimeError(
+                f"替换分片文件失败，数据处于部分迁移状态（{e}）。"
+                f"已替换为新数据: {', '.join(replaced) or '无'}；"
+                f"尚未替换，新数据仍在临时文件中: "
+                f"{', '.join(pending)}。"
+                "请手动完成剩余的替换，不要删除源文件"
+            ) from e
+        replaced.append(target_path)
+
+    if remove_source:
+        for path in source_paths:
+            if path not in target_paths and os.path.exists(path):
+                os.remove(path)
+
+    return conversation_count, user_count
+
+
+def _remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _copy_shards(source_paths, tmp_paths, to_shards):
+    """把源文件的数据按新的分片数写入临时分片，返回对话数和用户数"""
+    targets = [sqlite3.connect(path) for path in tmp_paths]
+    conversation_count = 0
+    user_ids = set()
+    try:
+        for source_path in source_paths:
+            source = sqlite3.connect(source_path)
+            try:
+                rows = source.execute('''
+                    SELECT user_id, user_message, bot_response, timestamp, context_summary
+                    FROM conversations
+                    ORDER BY id
+                ''')
+                for row in rows:
+                    targets[shard_index(row[0], to_shards)].execute('''
+                        INSERT INTO conversations
+                        (user_id, user_message, bot_response, timestamp, context_summary)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', row)
+                    conversation_count += 1
+
+                rows = source.execute('''
+                    SELECT user_id, known_interests, conversation_style,
+                           last_interaction, total_interactions
+                    FROM user_profiles
+                ''')
+                for row in rows:
+                    targets[shard_index(row[0], to_shards)].execute('''
+                        INSERT OR REPLACE INTO user_profiles
+                        (user_id, known_interests, conversation_style,
+                         last_interaction, total_interactions)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', row)
+                    user_ids.add(row[0])
+            finally:
+                source.close()
+
+        for target in targets:
+            target.commit()
+    finally:
+        for target in targets:
+            target.close()
+    return conversation_count, len(user_ids)
+
+
+def _verify_shards(tmp_paths, conversation_count, user_count):
+    """用新连接重新打开临时分片，确认数据都已提交且文件完好"""
+    conversations = 0
+    users = 0
+    for path in tmp_paths:
+        if not os.path.exists(path):
+            raise RuntimeError(f"临时分片不存在: {path}")
+        conn = sqlite3.connect(path)
+        try:
+            if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                raise RuntimeError(f"临时分片校验失败: {path}")
+            conversations += conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            users += conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+        finally:
+            conn.close()
+    if (conversations, users) != (conversation_count, user_count):
+        raise RuntimeError(
+            f"临时分片数据不完整：应有 {conversation_count} 条对话、{user_count} 个用户，"
+            f"实际 {conversations} 条对话、{users} 个用户"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线重新分片对话数据库")
+    parser.add_argument("--db", default="chat_memory.db", help="主数据库路径（分片文件名由它派生）")
+    parser.add_argument("--from-shards", type=int, default=1, help="当前分片数")
+    parser.add_argument("--shards", type=int, required=True, help="目标分片数")
+    parser.add_argument("--remove-source", action="store_true", help="迁移完成后删除旧的源文件")
+    parser.add_argument("--force", action="store_true", help="覆盖已存在的非源目标分片文件")
+    args = parser.parse_args()
+
+    try:
+        conversations, users = reshard(
+            args.db, args.from_shards, args.shards, args.remove_source, args.force
+        )
+    except (FileNotFoundError, FileExistsError, RuntimeError) as e:
+        parser.exit(1, f"错误: {e}\n")
+    print(f"迁移完成：{conversations} 条对话，{users} 个用户 -> {args.shards} 个分片")
+    for path in shard_paths(args.db, args.shards):
+        print(f"  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import importlib
+import os
+import shutil
+
+import pytest
+
+from memory_system import MemorySystem
+
+pytest.importorskip("flask")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # 在临时目录里导入 app，避免模块级的 MemorySystem() 改动仓库里的 chat_memory.db
+    workdir = tmp_path_factory.mktemp("app")
+    shutil.copytree(os.path.join(ROOT, "personas"), workdir / "personas")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module, monkeypatch, tmp_path):
+    memory_system = MemorySystem(str(tmp_path / "chat_memory.db"), num_shards=4)
+    for i in range(250):
+        memory_system.save_conversation(f"user_{i % 30}", f"消息 {i}", f"回复 {i}")
+    monkeypatch.setattr(app_module, "memory_system", memory_system)
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    return app_module.app.test_client()
+
+
+ADMIN_ROUTES = ["/admin/users", "/admin/conversations", "/admin/shards"]
+
+
+@pytest.mark.parametrize("route", ADMIN_ROUTES)
+def test_admin_routes_disabled_without_token(client, app_module, monkeypatch, route):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", None)
+    assert client.get(route, headers={"X-Admin-Token": "secret"}).status_code == 404
+
+
+@pytest.mark.parametrize("route", ADMIN_ROUTES)
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_admin_routes_reject_bad_token(client, route, headers):
+    assert client.get(route, headers=headers).status_code == 403
+
+
+def test_admin_routes_merge_shards_with_valid_token(client):
+    headers = {"X-Admin-Token": "secret"}
+
+    users = client.get("/admin/users", headers=headers)
+    assert users.status_code == 200
+    assert len(users.get_json()) == 30
+
+    shards = client.get("/admin/shards", headers=headers).get_json()
+    assert len(shards) == 4
+    assert sum(stats["conversations"] for stats in shards) == 250
+
+    conversations = client.get("/admin/conversations", headers=headers).get_json()
+    assert len(conversations) == 20
+
+
+@pytest.mark.parametrize("limit, expected", [(-1, 1), (0, 1), (5, 5), (1000, 200)])
+def test_admin_conversations_clamps_limit(client, limit, expected):
+    response = client.get(f"/admin/conversations?limit={limit}", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert len(response.get_json()) == expected
@@ -0,0 +1,60 @@
+import pytest
+
+from memory_system import MemorySystem
+
+
+def test_recent_conversations_across_shards(tmp_path):
+    memory_system = MemorySystem(str(tmp_path / "chat_memory.db"), num_shards=4)
+    for i in range(30):
+        memory_system.save_conversation(f"user_{i}", f"消息 {i}", f"回复 {i}")
+
+    assert len(memory_system.get_recent_conversations(limit=10)) == 10
+    assert len(memory_system.list_users()) == 30
+    assert sum(stats["conversations"] for stats in memory_system.get_shard_stats()) == 30
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_recent_conversations_rejects_non_positive_limit(tmp_path, limit):
+    memory_system = MemorySystem(str(tmp_path / "chat_memory.db"), num_shards=2)
+    with pytest.raises(ValueError):
+        memory_system.get_recent_conversations(limit=limit)
+
+
+def test_warns_when_unsharded_data_is_left_behind(tmp_path, caplog):
+    db_path = str(tmp_path / "chat_memory.db")
+    MemorySystem(db_path).save_conversation("old", "旧消息", "旧回复")
+
+    with caplog.at_level("WARNING", logger="memory_system"):
+        MemorySystem(db_path, num_shards=2)
+
+    assert "reshard.py" in caplog.text
+
+
+@pytest.mark.parametrize("old_shards, new_shards", [(2, 4), (4, 2), (4, 8)])
+def test_warns_when_shard_count_changes(tmp_path, caplog, old_shards, new_shards):
+    db_path = str(tmp_path / "chat_memory.db")
+    memory_system = MemorySystem(db_path, num_shards=old_shards)
+    for i in range(20):
+        memory_system.save_conversation(f"user_{i}", f"消息 {i}", f"回复 {i}")
+
+    with caplog.at_level("WARNING", logger="memory_system"):
+        MemorySystem(db_path, num_shards=new_shards)
+
+    assert f"按 {old_shards} 个分片创建" in caplog.text
+
+
+def test_no_warning_when_reopened_with_same_shard_count(tmp_path, caplog):
+    db_path = str(tmp_path / "chat_memory.db")
+    MemorySystem(db_path, num_shards=4).save_conversation("user", "消息", "回复")
+
+    with caplog.at_level("WARNING", logger="memory_system"):
+        MemorySystem(db_path, num_shards=4)
+
+    assert caplog.text == ""
+
+
+def test_no_warning_for_fresh_sharded_store(tmp_path, caplog):
+    with caplog.at_level("WARNING", logger="memory_system"):
+        MemorySystem(str(tmp_path / "chat_memory.db"), num_shards=2)
+
+    assert caplog.text == ""
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+
+import pytest
+
+from memory_system import MemorySystem, shard_paths
+import reshard as reshard_module
+from reshard import reshard
+
+
+def _dump(db_path, num_shards):
+    conversations = []
+    profiles = []
+    for path in shard_paths(db_path, num_shards):
+        conn = sqlite3.connect(path)
+        conversations.extend(conn.execute('''
+            SELECT user_id, user_message, bot_response, timestamp, context_summary
+            FROM conversations
+        ''').fetchall())
+        profiles.extend(conn.execute('''
+            SELECT user_id, known_interests, conversation_style,
+                   last_interaction, total_interactions
+            FROM user_profiles
+        ''').fetchall())
+        conn.close()
+    return sorted(conversations), sorted(profiles, key=lambda row: row[0])
+
+
+def test_round_trip_preserves_conversations_and_profiles(tmp_path):
+    db_path = str(tmp_path / "chat_memory.db")
+    memory_system = MemorySystem(db_path)
+    for i in range(40):
+        user_id = f"user_{i % 7}"
+        memory_system.save_conversation(user_id, f"消息 {i}", f"回复 {i}", context_summary=f"摘要 {i}")
+    memory_system.update_user_interests("user_3", ["电影", "音乐"])
+    expected = _dump(db_path, 1)
+
+    assert reshard(db_path, 1, 4, remove_source=True) == (40, 7)
+    assert not os.path.exists(db_path)
+    assert _dump(db_path, 4) == expected
+
+    assert reshard(db_path, 4, 2, remove_source=True) == (40, 7)
+    assert _dump(db_path, 2) == expected
+    assert all(not os.path.exists(path) for path in shard_paths(db_path, 4)[2:])
+
+    sharded = MemorySystem(db_path, num_shards=2)
+    assert len(sharded.get_conversation_history("user_3", limit=100)) == 6
+    assert sharded.get_user_profile("user_3")["known_interests"] == ["电影", "音乐"]
+
+
+def test_refuses_to_overwrite_existing_shards(tmp_path):
+    db_path = str(tmp_path / "chat_memory.db")
+    MemorySystem(db_path).save_conversation("old", "旧消息", "旧回复")
+    sharded = MemorySystem(db_path, num_shards=2)
+    sharded.save_conversation("new", "新消息", "新回复")
+    before = _dump(db_path, 2)
+
+    with pytest.raises(FileExistsError):
+        reshard(db_path, 1, 2)
+
+    assert _dump(db_path, 2) == before
+    assert sharded.get_conversation_history("new") == [("新消息", "新回复")]
+    assert not any(name.startswith("chat_memory.resharding") for name in os.listdir(tmp_path))
+
+
+def test_force_overwrites_existing_shards(tmp_path):
+    db_path = str(tmp_path / "chat_memory.db")
+    MemorySystem(db_path).save_conversation("old", "旧消息", "旧回复")
+    MemorySystem(db_path, num_shards=2).save_conversation("new", "新消息", "新回复")
+
+    assert reshard(db_path, 1, 2, force=True) == (1, 1)
+
+    sharded = MemorySystem(db_path, num_shards=2)
+    assert sharded.get_conversation_history("old") == [("旧消息", "旧回复")]
+    assert sharded.get_conversation_history("new") == []
+
+
+def test_copy_failure_removes_temp_files(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat_memory.db")
+    memory_system = MemorySystem(db_path, num_shards=2)
+    for i in range(10):
+        memory_system.save_conversation(f"user_{i}", f"消息 {i}", f"回复 {i}")
+    before = _dump(db_path, 2)
+
+    calls = []
+
+    def failing_shard_index(user_id, num_shards):
+        calls.append(user_id)
+        if len(calls) > 5:
+            raise sqlite3.OperationalError("disk I/O error")
+        return 0
+
+    monkeypatch.setattr(reshard_module, "shard_index", failing_shard_index)
+    with pytest.raises(sqlite3.OperationalError):
+        reshard(db_path, 2, 4)
+
+    assert not any(name.startswith("chat_memory.resharding") for name in os.listdir(tmp_path))
+    assert not os.path.exists(shard_paths(db_path, 4)[3])
+    assert _dump(db_path, 2) == before
+
+
+def test_replace_failure_reports_partial_migration(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat_memory.db")
+    MemorySystem(db_path).save_conversation("user", "消息", "回复")
+
+    real_replace = os.replace
+    calls = []
+
+    def failing_replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError("read-only file system")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(reshard_module.os, "replace", failing_replace)
+    with pytest.raises(RuntimeError) as excinfo:
+        reshard(db_path, 1, 3)
+
+    message = str(excinfo.value)
+    target_paths = shard_paths(db_path, 3)
+    assert target_paths[0] in message
+    assert f"chat_memory.resharding.shard1.db -> {target_paths[1]}" in message
+    assert f"chat_memory.resharding.shard2.db -> {target_paths[2]}" in message
+    assert os.path.exists(db_path)